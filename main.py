@@ -1,8 +1,11 @@
 import dearpygui.dearpygui as dpg
 from src.game import RLPlayer, HumanPlayer
 from src.strategy import Strategy
+from src.spectator import Spectator
+from src.online import OnlineLearner
 import numpy as np
 import pickle
+import time
 
 def draw_cards(deck, n):
     indices = np.random.choice(len(deck), size=n, replace=False)
@@ -69,8 +72,15 @@ class GameState:
         self.game_over = False
         self.last_showdown_info = ""
         self.game_started = False
+        self.online_learner = None # set if the RLPlayer learns from the hands against the human
+        self.trajectory = None
         
     def new_game(self):
+        # Swap in the latest strategy from the online learner, only ever between hands
+        if self.online_learner is not None:
+            updated = self.online_learner.take_update()
+            if updated is not None:
+                self.rlplayer.strategy = updated
         self.stake = 1
         self.deck = [j for j in range(1, 11) for _ in range(4)]
         self.board = []
@@ -81,7 +91,37 @@ class GameState:
         self.game_active = True
         self.game_over = False
         self.last_showdown_info = ""
+        if self.online_learner is not None:
+            # Same lists as a Game keeps: index 0 is the RLPlayer, index 1 is the human
+            self.trajectory = {"rewards": [[], []], "state_idxs": [[], []], "state_list_idxs": [[], []], "actions": [[], []]}
+            self.record_state()
         self.update_display()
+    
+    def record_state(self):
+        """Record the state both players are in after a round (or at the start of the hand)"""
+        for idx, player in enumerate([self.rlplayer, self.human_player]):
+            if self.end:
+                self.trajectory["state_list_idxs"][idx].append(4)  # terminal
+            else:
+                self.trajectory["state_list_idxs"][idx].append(self.t)
+                self.trajectory["state_idxs"][idx].append(self.rlplayer.strategy._get_state_idx(player.hand, self.board))
+    
+    def record_round(self, rl_action, human_action, winner):
+        """Record the actions and rewards of a round, and hand the trajectory to the learner when the hand is over"""
+        actions = [rl_action, human_action]
+        if winner is not None:  # showdown
+            rewards = [0, 0] if winner == 2 else [self.stake * 2 if idx == winner else -self.stake * 2 for idx in range(2)]
+        elif rl_action == human_action:  # both called or both folded
+            rewards = [0, 0]
+        else:
+            rewards = [self.stake if action == 0 else -self.stake for action in actions]
+        for idx in range(2):
+            self.trajectory["actions"][idx].append(actions[idx])
+            self.trajectory["rewards"][idx].append(rewards[idx])
+        if self.end:
+            self.record_state()
+            self.online_learner.record_hand(self.trajectory)
+            self.trajectory = None
         
     def update_display(self):
         dpg.set_value("human_credits", f"{self.human_player.credits}")
@@ -153,6 +193,7 @@ class GameState:
         
         # Reset showdown info for non-showdown rounds
         self.last_showdown_info = ""
+        winner = None
         
         if rl_action == 0 and human_action == 0:
             if self.t != 3:
@@ -210,11 +251,16 @@ class GameState:
                 self.last_showdown_info += ">>> IT'S A TIE!"
             self.end = True
         
+        if self.trajectory is not None:
+            self.record_round(rl_action, human_action, winner)
+        
         if not self.end:
             self.board.extend(draw_cards(self.deck, 1))
             result_message += f"\nNew card dealt: {self.board[-1]}\n"
             self.t += 1
             self.stake *= 2
+            if self.trajectory is not None:
+                self.record_state()
         
         dpg.set_value("result", result_message)
         self.update_display()
@@ -250,8 +296,78 @@ def start_game_callback():
     dpg.configure_item("welcome_screen", show=False)
     dpg.configure_item("main_content", show=True)
     game_state.game_started = True
+    if dpg.get_value("online_learning") and game_state.online_learner is None:
+        game_state.online_learner = OnlineLearner(game_state.rlplayer.strategy)
     game_state.new_game()
 
+# Spectator mode: the bots play each other on a worker thread,
+# and the render loop only reads their stats SPECTATOR_FPS times a second
+SPECTATOR_FPS = 10
+spectator = None
+spectator_sample = None # the last stats we drew, used for hands/sec
+
+def make_spectator():
+    global spectator, spectator_sample
+    if spectator is not None:
+        spectator.stop()
+    if dpg.get_value("spectator_opponent") == "Random baseline":
+        opponent = Strategy(n=1, gamma=1, epsilon=1)
+    else:
+        opponent = None # RLPlayer vs itself
+    spectator = Spectator(game_state.rlplayer.strategy, opponent)
+    spectator_sample = None
+
+def spectate_callback():
+    dpg.configure_item("welcome_screen", show=False)
+    dpg.configure_item("spectator_screen", show=True)
+    if spectator is None:
+        make_spectator()
+
+def spectator_start_stop_callback():
+    if spectator.is_running():
+        spectator.stop()
+        dpg.set_item_label("spectator_start_btn", "START")
+        update_spectator_display()  # draw the last batch, the render loop only updates while running
+    else:
+        spectator.start()
+        dpg.set_item_label("spectator_start_btn", "STOP")
+
+def spectator_opponent_callback():
+    was_running = spectator is not None and spectator.is_running()
+    make_spectator()
+    update_spectator_display()
+    if was_running:
+        spectator.start()
+
+def spectator_reset_callback():
+    global spectator_sample
+    spectator.reset()
+    spectator_sample = None
+    update_spectator_display()
+
+def spectator_back_callback():
+    spectator.stop()
+    dpg.set_item_label("spectator_start_btn", "START")
+    dpg.configure_item("spectator_screen", show=False)
+    dpg.configure_item("welcome_screen", show=True)
+
+def update_spectator_display():
+    global spectator_sample
+    stats = spectator.stats()
+    if not spectator.is_running():
+        dpg.set_value("spectator_speed", "0")
+    elif spectator_sample is not None and stats["time"] > spectator_sample["time"]:
+        hands_per_sec = (stats["hands"] - spectator_sample["hands"]) / (stats["time"] - spectator_sample["time"])
+        dpg.set_value("spectator_speed", f"{hands_per_sec:,.0f}")
+    spectator_sample = stats
+    dpg.set_value("spectator_hands", f"{stats['hands']:,}")
+    dpg.set_value("spectator_credits_0", f"{stats['credits'][0]:,}")
+    dpg.set_value("spectator_credits_1", f"{stats['credits'][1]:,}")
+    dpg.set_value("spectator_series_0", [stats["curve_hands"], stats["curves"][0]])
+    dpg.set_value("spectator_series_1", [stats["curve_hands"], stats["curves"][1]])
+    dpg.fit_axis_data("spectator_x_axis")
+    dpg.fit_axis_data("spectator_y_axis")
+
 # Create DearPyGUI context
 dpg.create_context()
 
@@ -303,10 +419,63 @@ with dpg.window(label="RL Poker", tag="main_window", width=900, height=950, no_s
             dpg.add_text("The deck contains cards numbered 1-10, with 4 of each number")
             dpg.add_spacer(height=20)
         
-        dpg.add_spacer(height=30)
+        dpg.add_spacer(height=15)
+        dpg.add_checkbox(label="Let RLPlayer learn from your games", tag="online_learning", default_value=False)
+        dpg.add_spacer(height=15)
         with dpg.group(horizontal=True):
-            dpg.add_spacer(width=320)
+            dpg.add_spacer(width=180)
             dpg.add_button(label="START GAME", callback=start_game_callback, width=250, height=70)
+            dpg.add_spacer(width=40)
+            dpg.add_button(label="SPECTATE BOTS", callback=spectate_callback, width=250, height=70)
+    
+    # Spectator screen (hidden until spectate is chosen)
+    with dpg.group(tag="spectator_screen", show=False):
+        dpg.add_text("SPECTATOR MODE")
+        dpg.add_separator()
+        dpg.add_spacer(height=10)
+        
+        with dpg.group(horizontal=True):
+            dpg.add_text("Opponent:")
+            dpg.add_radio_button(["RLPlayer", "Random baseline"], tag="spectator_opponent", default_value="RLPlayer",
+                                 horizontal=True, callback=spectator_opponent_callback)
+        dpg.add_spacer(height=10)
+        
+        # Stats section
+        with dpg.group(horizontal=True):
+            with dpg.child_window(width=205, height=80, border=True):
+                dpg.add_text("HANDS PLAYED")
+                dpg.add_spacer(height=5)
+                dpg.add_text("0", tag="spectator_hands")
+            with dpg.child_window(width=205, height=80, border=True):
+                dpg.add_text("HANDS / SEC")
+                dpg.add_spacer(height=5)
+                dpg.add_text("0", tag="spectator_speed")
+            with dpg.child_window(width=205, height=80, border=True):
+                dpg.add_text("RLPLAYER CREDITS")
+                dpg.add_spacer(height=5)
+                dpg.add_text("0", tag="spectator_credits_0")
+            with dpg.child_window(width=205, height=80, border=True):
+                dpg.add_text("OPPONENT CREDITS")
+                dpg.add_spacer(height=5)
+                dpg.add_text("0", tag="spectator_credits_1")
+        
+        dpg.add_spacer(height=15)
+        
+        # Running credit curves
+        with dpg.plot(label="Credits won", width=860, height=450):
+            dpg.add_plot_legend()
+            dpg.add_plot_axis(dpg.mvXAxis, label="Hands", tag="spectator_x_axis")
+            with dpg.plot_axis(dpg.mvYAxis, label="Credits", tag="spectator_y_axis"):
+                dpg.add_line_series([0], [0], label="RLPlayer", tag="spectator_series_0")
+                dpg.add_line_series([0], [0], label="Opponent", tag="spectator_series_1")
+        
+        dpg.add_spacer(height=15)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="START", tag="spectator_start_btn", callback=spectator_start_stop_callback, width=180, height=60)
+            dpg.add_spacer(width=20)
+            dpg.add_button(label="RESET", callback=spectator_reset_callback, width=180, height=60)
+            dpg.add_spacer(width=20)
+            dpg.add_button(label="BACK", callback=spectator_back_callback, width=180, height=60)
     
     # Title (hidden initially)
     dpg.add_text("RL POKER", tag="title")
@@ -428,5 +597,17 @@ dpg.set_global_font_scale(1.3)
 dpg.show_viewport()
 dpg.set_primary_window("main_window", True)
 
-dpg.start_dearpygui()
+# Render loop (instead of dpg.start_dearpygui) so the spectator stats are only sampled at a fixed frame rate
+last_spectator_update = 0
+while dpg.is_dearpygui_running():
+    now = time.perf_counter()
+    if spectator is not None and spectator.is_running() and now - last_spectator_update >= 1 / SPECTATOR_FPS:
+        update_spectator_display()
+        last_spectator_update = now
+    dpg.render_dearpygui_frame()
+
+if spectator is not None:
+    spectator.stop()
+if game_state.online_learner is not None:
+    game_state.online_learner.stop()
 dpg.destroy_context()
\ No newline at end of file
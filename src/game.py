@@ -59,10 +59,10 @@ class HumanPlayer(Player):
 
 # This is how i define a game, this class is primarily for simulation
 class Game():
-    def __init__(self, players: list[Player]):
-        self.deck = [] # adding 4 of each card to the deck in the beginning of a game
-        for j in range(1, 11): # of values 1-10 
-            self.deck.extend([j, j, j, j]) #clubs, diamonds, hearts, spades
+    def __init__(self, players: list[Player], n_values = 10, n_suits = 4):
+        self.deck = [] # adding n_suits (4) of each card to the deck in the beginning of a game
+        for j in range(1, n_values + 1): # of values 1-10 (unless we play with a bigger deck)
+            self.deck.extend([j] * n_suits) #clubs, diamonds, hearts, spades
         self.board = []
         self.players = players
         for player in self.players: #giving players 2 cards 
@@ -0,0 +1,208 @@
+import copy
+import functools
+import itertools
+import math
+import time
+import numpy as np
+from src.strategy import Strategy
+from src.game import Game
+from src.sweep import make_strategy, train, evaluate
+
+N_FEATURES = 16
+
+# the features of many states at once, all the hands (n_states, 2) and boards (n_states, n_board_cards) are given as arrays.
+# the features only describe how good the cards are, not the exact cards, so the amount of them does not grow with the deck
+def extract_features(hands, boards, n_values = 10):
+    hands = np.asarray(hands).reshape(-1, 2)
+    boards = np.asarray(boards).reshape(len(hands), -1)
+    values = np.arange(1, n_values + 1)
+    hand_counts = (hands[:, :, None] == values).sum(axis = 1) # how many of each value (n_states, n_values)
+    board_counts = (boards[:, :, None] == values).sum(axis = 1)
+    counts = hand_counts + board_counts
+
+    max_count = counts.max(axis = 1)
+    best_value = n_values - np.argmax(counts[:, ::-1], axis = 1) # the highest value with the max count, like Game.get_winner
+    best_in_hand = hand_counts[np.arange(len(hands)), best_value - 1] > 0 # does our hand help the best combination
+    board_max_count = board_counts.max(axis = 1)
+    board_top = np.max(boards, axis = 1, initial = 0)
+
+    features = np.zeros([len(hands), N_FEATURES])
+    features[:, 0] = 1 # bias
+    features[:, 1] = hands[:, 0] == hands[:, 1] # pocket pair
+    features[:, 2] = hands.max(axis = 1) / n_values # top rank in hand
+    features[:, 3] = hands.min(axis = 1) / n_values
+    features[:, 4] = (counts == 2).sum(axis = 1) # pairs
+    features[:, 5] = (counts == 3).sum(axis = 1) # trips
+    features[:, 6] = (counts >= 4).sum(axis = 1) # quads
+    features[:, 7] = max_count / 4
+    features[:, 8] = best_value / n_values # the value of the best combination
+    features[:, 9] = best_in_hand
+    features[:, 10] = best_in_hand * max_count / 4
+    # board texture
+    features[:, 11] = (board_counts == 2).sum(axis = 1) # pairs on the board
+    features[:, 12] = board_max_count / 4
+    features[:, 13] = board_top / n_values
+    features[:, 14] = (board_counts * (hand_counts > 0)).sum(axis = 1) / 3 # board cards that match our hand
+    features[:, 15] = max_count > board_max_count # we have something better than what everybody has
+    return features
+
+# every hand and board (sorted) with n_board_cards cards on the board, as two arrays
+def enumerate_states(n_board_cards, n_values = 10):
+    hands = np.array(list(itertools.combinations_with_replacement(range(1, n_values + 1), 2)))
+    boards = list(itertools.combinations_with_replacement(range(1, n_values + 1), n_board_cards))
+    boards = np.array(boards, dtype = int).reshape(len(boards), n_board_cards)
+    return np.repeat(hands, len(boards), axis = 0), np.tile(boards, (len(hands), 1))
+
+# an epsilon greedy strategy with a linear action value function over hand features instead of a table,
+# it has the same interface as Strategy so it can be used in a Game (and train, evaluate), but the "state index" it gives the game
+# is the feature vector of the state. there is one set of weights pr. round (state list) and action,
+# and the n-step tree backup targets are collected and applied as one gradient step every batch_size updates.
+class LinearStrategy(Strategy):
+    def __init__(self, n, gamma, alpha = 0.01, decay_rate = 0, epsilon = 0.1, n_values = 10, batch_size = 32, max_cache = 100000):
+        """
+        ##parameters:
+        n: the amount of timesteps the n-step backup
+        gamma: the discount rate
+        alpha: the initial learning rate for the gradient steps
+        decay_rate: the decay rate for alpha given the amount of gradient steps taken
+        n_values: the number of card values in the deck (1 to n_values)
+        batch_size: the number of value updates in each gradient step
+        max_cache: the maximum number of states whose features are cached
+        """
+        # not calling Strategy.__init__, since we do not want the tables
+        self.n = n
+        self.gamma = gamma
+        self.alpha = alpha
+        self.decay_rate = decay_rate
+        self.epsilon = epsilon
+        self.n_values = n_values
+        self.batch_size = batch_size
+        self.max_cache = max_cache
+        self.weights = np.zeros([4, 2, N_FEATURES]) # [round, action, feature]
+        # how many updates each round and action got. it is not called n_action_updates like in Strategy,
+        # since it is one [round, action] array and not a table pr. round with a count for every state
+        self.n_round_updates = np.zeros([4, 2])
+        self.n_batches = 0
+        self._clear_batch()
+        self._feature_cache = None # (sorted hand, sorted board) -> features, filled the first time it is needed
+
+    # the feature cache is not pickled or copied, it is cheap to build again
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_feature_cache"] = None
+        return state
+
+    # extracting the features one state at a time is slow, so if all the states fit in the cache
+    # we extract them all at once in a single vectorized call pr. round
+    def _fill_feature_cache(self):
+        self._feature_cache = {}
+        n_hands = math.comb(self.n_values + 1, 2)
+        n_states = sum(n_hands * math.comb(self.n_values + k - 1, k) for k in range(4))
+        if n_states > self.max_cache: # too many, the features are cached as the states are visited
+            return
+        for k in range(4):
+            hands, boards = enumerate_states(k, self.n_values)
+            features = extract_features(hands, boards, self.n_values)
+            features.flags.writeable = False
+            for hand, board, row in zip(hands.tolist(), boards.tolist(), features):
+                self._feature_cache[(tuple(hand), tuple(board))] = row
+
+    def _clear_batch(self):
+        self.batch_state_lists = []
+        self.batch_actions = []
+        self.batch_features = []
+        self.batch_targets = []
+
+    @property
+    def nbytes(self):
+        return self.weights.nbytes + self.n_round_updates.nbytes
+
+    # the feature vector is what we use as the state index
+    def _get_state_idx(self, hand, board):
+        if self._feature_cache is None:
+            self._fill_feature_cache()
+        key = (tuple(sorted(hand)), tuple(sorted(board))) # the features do not depend on the order of the cards
+        features = self._feature_cache.get(key)
+        if features is None:
+            features = extract_features([hand], [board], self.n_values)[0]
+            features.flags.writeable = False
+            if len(self._feature_cache) >= self.max_cache:
+                self._feature_cache.clear()
+            self._feature_cache[key] = features
+        return features
+
+    def _get_values_from_idx(self, state_list_idx, state_idx):
+        return self.weights[state_list_idx] @ state_idx
+
+    #given the cards and board, get the action values
+    def _get_action_values(self, cards, board):
+        return self._get_values_from_idx(len(board), self._get_state_idx(cards, board))
+
+    # the action values of many states at once
+    def get_action_values(self, hands, boards):
+        features = extract_features(hands, boards, self.n_values)
+        return features @ self.weights[np.asarray(boards).reshape(len(features), -1).shape[1]].T
+
+    # collects the n-step tree backup target, and makes a gradient step when the batch is full
+    def make_value_update(self, rewards: list[int], state_idxs: list[int], state_list_idxs: list[int], action_list: list[int], t, n):
+        Gt = self._get_n_step_tree_backup(rewards, state_idxs, state_list_idxs, action_list, self.gamma, n, t)
+        self.batch_state_lists.append(state_list_idxs[t])
+        self.batch_actions.append(action_list[t])
+        self.batch_features.append(state_idxs[t])
+        self.batch_targets.append(Gt)
+        self.n_round_updates[state_list_idxs[t], action_list[t]] += 1
+        if len(self.batch_targets) >= self.batch_size:
+            self.apply_batch()
+
+    # one gradient step on the squared error of all the collected targets
+    def apply_batch(self):
+        if not self.batch_targets:
+            return
+        state_lists = np.array(self.batch_state_lists)
+        actions = np.array(self.batch_actions)
+        features = np.array(self.batch_features)
+        targets = np.array(self.batch_targets)
+        predictions = np.einsum("ij,ij->i", self.weights[state_lists, actions], features)
+        alpha = self.alpha / (1 + self.decay_rate * self.n_batches)
+        gradients = (alpha * (targets - predictions))[:, None] * features
+        np.add.at(self.weights, (state_lists, actions), gradients)
+        self.n_batches += 1
+        self._clear_batch()
+
+# trains a tabular and a linear strategy on the current game and compares them: their scores against a random player
+# after each number of games in checkpoints (to see how many games each needs), the training time pr. game,
+# how much memory they use, and the final linear strategy against the final tabular one
+def compare_backends(n_games = 100000, eval_games = 10000, tabular_config = None, linear_args = None, seed = 0, checkpoints = None):
+    checkpoints = sorted(set(checkpoints or []) | {n_games})
+    tabular_config = tabular_config or {}
+    tabular = make_strategy(tabular_config)
+    linear = LinearStrategy(**{"n": 2, "gamma": 1, "epsilon": 0.25, **(linear_args or {})})
+    results = {}
+    for name, strategy, config in [("tabular", tabular, tabular_config), ("linear", linear, {"epsilon": linear.epsilon})]:
+        np.random.seed(seed)
+        curve = {}
+        train_time = 0
+        games_played = 0
+        for games in checkpoints:
+            start = time.perf_counter()
+            train(strategy, config, games - games_played, games_played, game_class = Game)
+            if strategy is linear:
+                linear.apply_batch()
+            train_time += time.perf_counter() - start
+            games_played = games
+            curve[games] = evaluate(strategy, eval_games, seed = seed, game_class = Game)
+        results[name] = {"vs_random": curve, "train_us_per_game": train_time / n_games * 1e6}
+
+    results["tabular"]["bytes"] = sum(values.nbytes for values in tabular.action_values) + sum(counts.nbytes for counts in tabular.n_action_updates)
+    results["linear"]["bytes"] = linear.nbytes
+    greedy_tabular = copy.deepcopy(tabular) # so the linear strategy plays the best version of the tabular one
+    greedy_tabular.epsilon = 0
+    results["linear_vs_tabular"] = evaluate(linear, eval_games, opponent = greedy_tabular, seed = seed, game_class = Game)
+    return results
+
+# trains a linear strategy on a bigger deck (cards 1 to n_values, n_suits of each)
+def train_big_deck(strategy: LinearStrategy, n_games, n_suits = 4, config = None):
+    game_class = functools.partial(Game, n_values = strategy.n_values, n_suits = n_suits)
+    train(strategy, {"epsilon": strategy.epsilon, **(config or {})}, n_games, game_class = game_class)
+    strategy.apply_batch()
+    return strategy
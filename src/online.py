@@ -0,0 +1,104 @@
+import copy
+import os
+import queue
+import threading
+import numpy as np
+from src.strategy import Strategy, require_tables
+
+# lets the bot learn from the hands it plays in the gui, without slowing down the gui:
+# the gui only puts finished hands on a queue, and a background thread makes the value updates
+# on its own copy of the strategy. after each hand a fresh copy is published, which the gui swaps in between hands.
+class OnlineLearner():
+    def __init__(self, strategy: Strategy, path = "strat/online_values.npy", save_every = 10):
+        """
+        ##parameters:
+        strategy: the strategy to keep learning, it is copied and never changed itself
+        path: the file with the learned action values and update counts, loaded if it exists
+        save_every: the number of hands between each time the updated values are written to the file
+        """
+        require_tables(strategy, "OnlineLearner")
+        self.learner = copy.deepcopy(strategy)
+        self.path = path
+        self.save_every = save_every
+        # the offset of each state list in the file, since they are stored next to each other
+        sizes = [values.shape[1] for values in self.learner.action_values]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self.file = self._open_file()
+        self.touched = set() # (state_list_idx, state_idx) updated since the last save
+        self.hands_learned = 0
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = copy.deepcopy(self.learner) # the latest updated strategy that the gui has not taken yet
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    # the file is a memory map of shape [2 (values, update counts), 2 (actions), all states],
+    # so saving only writes the entries that changed instead of pickling the whole strategy again
+    def _open_file(self):
+        shape = (2, 2, int(self.offsets[-1]))
+        if os.path.exists(self.path):
+            file = np.lib.format.open_memmap(self.path, mode = "r+")
+            if file.shape != shape:
+                raise ValueError("{} has shape {}, expected {}".format(self.path, file.shape, shape))
+            for i in range(len(self.learner.action_values)): # continue from the last session
+                self.learner.action_values[i] = np.array(file[0, :, self.offsets[i]:self.offsets[i+1]])
+                self.learner.n_action_updates[i] = np.array(file[1, :, self.offsets[i]:self.offsets[i+1]])
+        else:
+            file = np.lib.format.open_memmap(self.path, mode = "w+", dtype = np.float64, shape = shape)
+            for i in range(len(self.learner.action_values)):
+                file[0, :, self.offsets[i]:self.offsets[i+1]] = self.learner.action_values[i]
+                file[1, :, self.offsets[i]:self.offsets[i+1]] = self.learner.n_action_updates[i]
+            file.flush()
+        return file
+
+    # called by the gui when a hand is done, trajectory has the same lists as a Game:
+    # rewards, state_idxs, state_list_idxs and actions, each with one list pr. player
+    def record_hand(self, trajectory):
+        self.queue.put(trajectory)
+
+    # called by the gui between hands, returns the updated strategy if there is a new one (otherwise None)
+    def take_update(self):
+        with self.lock:
+            strategy, self.pending = self.pending, None
+        return strategy
+
+    def _run(self):
+        while True:
+            trajectory = self.queue.get()
+            if trajectory is None: # stop
+                break
+            self._learn(trajectory)
+            updated = copy.deepcopy(self.learner)
+            with self.lock:
+                self.pending = updated
+            self.hands_learned += 1
+            if self.hands_learned % self.save_every == 0:
+                self.save()
+
+    # makes the same n-step tree backup updates that Game makes during a hand
+    def _learn(self, trajectory):
+        strategy = self.learner
+        for player in range(2):
+            T = len(trajectory["actions"][player])
+            for t in range(T):
+                strategy.make_value_update(trajectory["rewards"][player],
+                                           trajectory["state_idxs"][player],
+                                           trajectory["state_list_idxs"][player],
+                                           trajectory["actions"][player],
+                                           t, n = min(strategy.n, T - t))
+                self.touched.add((trajectory["state_list_idxs"][player][t], trajectory["state_idxs"][player][t]))
+
+    # writes only the states updated since the last save
+    def save(self):
+        for state_list_idx, state_idx in self.touched:
+            column = self.offsets[state_list_idx] + state_idx
+            self.file[0, :, column] = self.learner.action_values[state_list_idx][:, state_idx]
+            self.file[1, :, column] = self.learner.n_action_updates[state_list_idx][:, state_idx]
+        self.file.flush()
+        self.touched = set()
+
+    # learns the hands still in the queue, saves and stops the thread
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.save()
@@ -0,0 +1,246 @@
+import multiprocessing
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+from src.strategy import require_tables
+from src.sweep import DEFAULT_CONFIG, make_strategy, train
+
+# training over several machines: every node trains on its own copy of the strategy and at every sync
+# pushes what changed since the last sync (value deltas and visit count increments) to the server,
+# which adds them to the merged table and sends back every entry other nodes changed since the node last synced
+# (the entries only the node itself touched are not sent back, the node already has them).
+#
+# a sync message from a node is:   header (node id, version), n entries, indices (uint32), value deltas (float32), count increments (uint32)
+# and the reply from the server:   header (version, staleness), n entries, indices (uint32), values (float32), counts (uint32)
+# the indices are into all the action values flattened (see flatten), so only the touched entries are sent.
+
+REQUEST_HEADER = struct.Struct("!IQI") # node id, the server version the node last saw, n entries
+REPLY_HEADER = struct.Struct("!QQI") # the version of the server, how many merges the node missed, n entries
+
+# all the tables of a strategy (one pr. amount of cards on the board) as one flat array
+def flatten(tables):
+    return np.concatenate([table.ravel() for table in tables])
+
+# writes a flat array back into the tables of a strategy
+def unflatten(flat, tables):
+    start = 0
+    for table in tables:
+        table[:] = flat[start:start + table.size].reshape(table.shape)
+        start += table.size
+
+# the values and deltas are sent as float32 to halve the size, so every sync rounds the float64 values of the node
+# to float32 precision (about 1e-7 relative error), the counts are exact
+def encode(header, header_values, indices, values, counts):
+    return b"".join([header.pack(*header_values, len(indices)),
+                     indices.astype(np.uint32).tobytes(), values.astype(np.float32).tobytes(), counts.astype(np.uint32).tobytes()])
+
+def _recv_exact(sock, n_bytes):
+    data = bytearray()
+    while len(data) < n_bytes:
+        chunk = sock.recv(n_bytes - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+# reads one message, returns the header values, the indices, values and counts
+def decode(sock, header):
+    *header_values, n = header.unpack(_recv_exact(sock, header.size))
+    body = _recv_exact(sock, 12 * n)
+    indices = np.frombuffer(body, dtype = np.uint32, count = n)
+    values = np.frombuffer(body, dtype = np.float32, count = n, offset = 4 * n)
+    counts = np.frombuffer(body, dtype = np.uint32, count = n, offset = 8 * n)
+    return header_values, indices, values, counts, header.size + 12 * n
+
+class _SyncHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.parameter_server
+        while True:
+            try:
+                (node_id, node_version), indices, deltas, increments, n_received = decode(self.request, REQUEST_HEADER)
+            except ConnectionError:
+                return
+            reply = server.merge(node_id, node_version, indices, deltas, increments)
+            self.request.sendall(reply)
+            server.count_bytes(n_received, len(reply))
+
+# holds the merged table and serves the nodes over tcp
+class ParameterServer():
+    def __init__(self, strategy = None, host = "127.0.0.1", port = 0):
+        """
+        ##parameters:
+        strategy: the strategy to start from, defaults to a new one with the notebook parameters
+        port: the tcp port to listen on, 0 picks a free one (see self.address)
+        """
+        self.strategy = make_strategy({}) if strategy is None else strategy
+        require_tables(self.strategy, "ParameterServer")
+        self.values = flatten(self.strategy.action_values)
+        self.counts = flatten(self.strategy.n_action_updates)
+        self.version = 1
+        self.last_changed = np.ones(len(self.values), dtype = np.int64) # the version each entry last changed in
+        self.lock = threading.Lock()
+        self.n_syncs = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.tcp_server = socketserver.ThreadingTCPServer((host, port), _SyncHandler)
+        self.tcp_server.daemon_threads = True
+        self.tcp_server.parameter_server = self
+        self.address = self.tcp_server.server_address
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target = self.tcp_server.serve_forever, daemon = True)
+        self.thread.start()
+        return self.address
+
+    def stop(self):
+        self.tcp_server.shutdown()
+        self.tcp_server.server_close()
+
+    # adds the deltas of a node and returns the reply with everything other nodes changed since its last sync
+    def merge(self, node_id, node_version, indices, deltas, increments):
+        with self.lock:
+            # merges from other nodes since this node last synced (0 on the first sync, when it has seen nothing)
+            staleness = self.version - node_version if node_version > 0 else 0
+            # found before our own merge, so the entries only this node touched are left out
+            changed = np.nonzero(self.last_changed > node_version)[0]
+            if len(indices) > 0:
+                self.version += 1
+                self.values[indices] += deltas
+                self.counts[indices] += increments
+                self.last_changed[indices] = self.version
+            self.n_syncs += 1
+            return encode(REPLY_HEADER, (self.version, staleness), changed, self.values[changed], self.counts[changed])
+
+    def count_bytes(self, n_received, n_sent):
+        with self.lock:
+            self.bytes_received += n_received
+            self.bytes_sent += n_sent
+
+    # the merged strategy
+    def get_strategy(self):
+        with self.lock:
+            unflatten(self.values, self.strategy.action_values)
+            unflatten(self.counts, self.strategy.n_action_updates)
+        return self.strategy
+
+    def stats(self):
+        with self.lock:
+            return {"version": self.version, "syncs": self.n_syncs,
+                    "bytes_received": self.bytes_received, "bytes_sent": self.bytes_sent}
+
+# a training node, it simulates games against its local copy and syncs with the server every sync_every games
+class TrainingNode():
+    def __init__(self, address, node_id = 0, config = None, sync_every = 10000):
+        """
+        ##parameters:
+        address: (host, port) of the parameter server
+        config: the Strategy arguments and epsilon schedule, like in the sweep
+        sync_every: the number of games between each sync with the server
+        """
+        self.address = address
+        self.node_id = node_id
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.sync_every = sync_every
+        self.strategy = make_strategy(self.config)
+        self.version = 0 # the server version we have seen
+        self.base_values = flatten(self.strategy.action_values) # what we had after the last sync
+        self.base_counts = flatten(self.strategy.n_action_updates)
+        self.sock = None
+        self.games_played = 0
+        self.n_syncs = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.staleness = [] # how many merges from other nodes we missed at each sync
+        self.sync_time = 0
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sync() # get the table of the server before we start
+
+    def close(self):
+        self.sock.close()
+
+    def sync(self):
+        start = time.perf_counter()
+        values = flatten(self.strategy.action_values)
+        counts = flatten(self.strategy.n_action_updates)
+        touched = np.nonzero(counts != self.base_counts)[0] # every value update also counts a visit
+        message = encode(REQUEST_HEADER, (self.node_id, self.version), touched,
+                         values[touched] - self.base_values[touched], counts[touched] - self.base_counts[touched])
+        self.sock.sendall(message)
+        (self.version, staleness), indices, server_values, server_counts, n_received = decode(self.sock, REPLY_HEADER)
+
+        values[indices] = server_values
+        counts[indices] = server_counts
+        unflatten(values, self.strategy.action_values)
+        unflatten(counts, self.strategy.n_action_updates)
+        self.base_values = values
+        self.base_counts = counts
+
+        self.n_syncs += 1
+        self.bytes_sent += len(message)
+        self.bytes_received += n_received
+        self.staleness.append(staleness)
+        self.sync_time += time.perf_counter() - start
+
+    def run(self, n_games):
+        if self.sock is None:
+            self.connect()
+        while n_games > 0:
+            games = min(self.sync_every, n_games)
+            train(self.strategy, self.config, games, self.games_played)
+            self.games_played += games
+            n_games -= games
+            self.sync()
+
+    def stats(self):
+        return {"node": self.node_id, "games": self.games_played, "syncs": self.n_syncs,
+                "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received,
+                "mean_staleness": float(np.mean(self.staleness)) if self.staleness else 0,
+                "max_staleness": max(self.staleness, default = 0), "sync_time": self.sync_time}
+
+def _run_node(address, node_id, config, sync_every, n_games, results):
+    np.random.seed(node_id)
+    node = TrainingNode(address, node_id, config, sync_every)
+    node.run(n_games)
+    node.close()
+    results.put(node.stats())
+
+# runs a server and n_nodes local processes standing in for the machines, returns the merged strategy and the stats
+def run_local(n_nodes = 4, n_games = 100000, sync_every = 10000, config = None):
+    server = ParameterServer(make_strategy(config or {}))
+    address = server.start()
+    results = multiprocessing.Queue()
+    nodes = [multiprocessing.Process(target = _run_node, args = (address, i, config, sync_every, n_games, results))
+             for i in range(n_nodes)]
+    node_stats = []
+    try:
+        for node in nodes:
+            node.start()
+        while len(node_stats) < n_nodes:
+            try:
+                node_stats.append(results.get(timeout = 1))
+                continue
+            except queue.Empty:
+                pass
+            # no results for a while, so check that the nodes are still alive instead of waiting forever
+            failed = [i for i, node in enumerate(nodes) if node.exitcode not in [None, 0]]
+            if failed:
+                raise RuntimeError("node {} exited with code {}".format(failed[0], nodes[failed[0]].exitcode))
+            if all(node.exitcode == 0 for node in nodes) and results.empty():
+                raise RuntimeError("the nodes exited without sending their stats")
+    finally:
+        for node in nodes:
+            if node.is_alive() and len(node_stats) < n_nodes: # we are failing, do not wait for the rest
+                node.terminate()
+            if node.pid is not None:
+                node.join()
+        server.stop()
+    node_stats.sort(key = lambda stats: stats["node"])
+    return server.get_strategy(), server.stats(), node_stats
@@ -0,0 +1,111 @@
+import random
+import numpy as np
+from src.strategy import Strategy, require_tables
+
+# a frozen copy of a strategy used as a past opponent in fictitious self-play.
+# it only keeps what it needs to chose actions: one greedy bit pr. state (packed 8 pr. byte),
+# and optionally the action values as float16 so it can be turned back into a full strategy.
+class SnapshotStrategy(Strategy):
+    def __init__(self, strategy: Strategy, keep_values = False):
+        """
+        ##parameters:
+        strategy: the strategy to freeze
+        keep_values: also keep the action values as float16 (otherwise only the greedy actions are kept)
+        """
+        require_tables(strategy, "SnapshotStrategy")
+        # not calling Strategy.__init__, since we do not want the full tables
+        self.n = strategy.n
+        self.gamma = strategy.gamma
+        self.alpha = strategy.alpha
+        self.decay_rate = strategy.decay_rate
+        self.epsilon = strategy.epsilon
+        self.index_class = type(strategy) # so we index the states the same way as the strategy we copied
+        # np.argmax picks action 0 on a tie, so action 1 is greedy only when it is strictly better
+        self.greedy = [np.packbits(values[1] > values[0]) for values in strategy.action_values]
+        self.values = [values.astype(np.float16) for values in strategy.action_values] if keep_values else None
+
+    @property
+    def nbytes(self):
+        nbytes = sum(bits.nbytes for bits in self.greedy)
+        if self.values is not None:
+            nbytes += sum(values.nbytes for values in self.values)
+        return nbytes
+
+    def _get_greedy_action(self, state_list_idx, state_idx):
+        byte = self.greedy[state_list_idx][state_idx >> 3]
+        return (int(byte) >> (7 - (state_idx & 7))) & 1
+
+    def _get_state_idx(self, hand, board):
+        return self.index_class._get_state_idx(self, hand, board)
+
+    #given the epsilon greedy policy, chose an action
+    def chose_action(self, board, hand):
+        if np.random.random() < self.epsilon: # random
+            return np.random.choice(2)
+        else: # greedy
+            return self._get_greedy_action(len(board), self._get_state_idx(hand, board))
+
+    # makes a full strategy again from the float16 values, with the same parameters as the strategy we copied.
+    # the update counts are not kept, so n_action_updates starts from zero (alpha is back at its initial value)
+    def to_strategy(self):
+        if self.values is None:
+            raise ValueError("the snapshot only has the greedy actions, use keep_values = True to restore it")
+        strategy = self.index_class(n = self.n, gamma = self.gamma, alpha = self.alpha,
+                                    decay_rate = self.decay_rate, epsilon = self.epsilon)
+        strategy.action_values = [values.astype(np.float64) for values in self.values]
+        return strategy
+
+# a bounded pool of past versions of a strategy to sample opponents from
+class SnapshotPool():
+    def __init__(self, max_size = 10, eviction = "latest", snapshot_every = 100000, keep_values = False, seed = None):
+        """
+        ##parameters:
+        max_size: the maximum number of snapshots in the pool
+        eviction: "latest" keeps the latest max_size snapshots, "reservoir" keeps a uniform sample of all snapshots taken
+        snapshot_every: how many games between each snapshot when training
+        keep_values: keep the float16 action values in each snapshot, not only the greedy actions
+        """
+        if eviction not in ["latest", "reservoir"]:
+            raise ValueError("eviction must be 'latest' or 'reservoir', not {}".format(eviction))
+        self.max_size = max_size
+        self.eviction = eviction
+        self.snapshot_every = snapshot_every
+        self.keep_values = keep_values
+        self.rng = random.Random(seed)
+        self.snapshots = []
+        self.n_seen = 0 # the number of snapshots ever added
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    # freezes a copy of the strategy and adds it to the pool, evicting one if it is full
+    def add(self, strategy: Strategy):
+        snapshot = SnapshotStrategy(strategy, keep_values = self.keep_values)
+        self.n_seen += 1
+        if len(self.snapshots) < self.max_size:
+            self.snapshots.append(snapshot)
+        elif self.eviction == "latest":
+            self.snapshots.pop(0)
+            self.snapshots.append(snapshot)
+        else: # reservoir sampling, every snapshot ever taken has the same chance of being in the pool
+            j = self.rng.randrange(self.n_seen)
+            if j < self.max_size:
+                self.snapshots[j] = snapshot
+        return snapshot
+
+    # a random opponent from the pool
+    def sample(self):
+        return self.rng.choice(self.snapshots)
+
+    @property
+    def nbytes(self):
+        return sum(snapshot.nbytes for snapshot in self.snapshots)
+
+    def report(self, strategy: Strategy = None):
+        text = "{} snapshots ({} taken, {} eviction) using {:.1f} kB".format(len(self.snapshots), self.n_seen,
+                                                                             self.eviction, self.nbytes/1e3)
+        if strategy is not None: # compared to the full table of the learner
+            full = sum(values.nbytes for values in strategy.action_values)
+            text += ", {:.1f} kB pr. snapshot vs {:.1f} kB for the full action values".format(
+                self.nbytes/max(1, len(self.snapshots))/1e3, full/1e3)
+        return text
@@ -0,0 +1,85 @@
+import copy
+import threading
+import time
+from src.game import RLPlayer
+from src.strategy import Strategy
+from src.tables import TableGame
+
+# runs bot vs bot games as fast as possible on a background thread,
+# the gui only reads a copy of the stats when it wants to draw them (see stats())
+class Spectator():
+    def __init__(self, strategy: Strategy, opponent: Strategy = None, batch_size = 200, max_points = 2000):
+        """
+        ##parameters:
+        strategy: the strategy of the first player, it is copied and does not learn while spectating
+        opponent: the strategy of the second player, defaults to the same strategy (bot vs itself)
+        batch_size: the number of hands between each time the shared stats are updated
+        max_points: the maximum number of points kept for the credit curves
+        """
+        self.strategy = self._freeze(strategy)
+        self.opponent = self.strategy if opponent is None else self._freeze(opponent)
+        self.batch_size = batch_size
+        self.max_points = max_points
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = threading.Event()
+        self.reset()
+
+    # a copy that skips the value updates the game makes, so playing it is as cheap as possible
+    def _freeze(self, strategy):
+        frozen = copy.deepcopy(strategy)
+        frozen.make_value_update = lambda *args, **kwargs: None
+        return frozen
+
+    def reset(self):
+        with self.lock:
+            self.hands = 0
+            self.credits = [0, 0]
+            self.curve_hands = [0] # the hand numbers of the points on the credit curves
+            self.curves = [[0], [0]]
+            self.record_every = 1
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.running.set()
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        return self.running.is_set()
+
+    def _run(self):
+        players = [RLPlayer(self.strategy), RLPlayer(self.opponent)]
+        while self.running.is_set():
+            # play a batch without touching the lock, then add it to the shared stats
+            rewards = []
+            for _ in range(self.batch_size):
+                game = TableGame(players)
+                game.simulate_game()
+                rewards.append((sum(game.rewards[0]), sum(game.rewards[1])))
+            with self.lock:
+                for reward0, reward1 in rewards:
+                    self.hands += 1
+                    self.credits[0] += reward0
+                    self.credits[1] += reward1
+                    if self.hands % self.record_every == 0:
+                        self.curve_hands.append(self.hands)
+                        self.curves[0].append(self.credits[0])
+                        self.curves[1].append(self.credits[1])
+                if len(self.curve_hands) > self.max_points: # keep every other point and record half as often
+                    self.curve_hands = self.curve_hands[::2]
+                    self.curves = [self.curves[0][::2], self.curves[1][::2]]
+                    self.record_every *= 2
+
+    # a copy of the current stats (hands played, credits of each player, and the credit curves)
+    def stats(self):
+        with self.lock:
+            return {"hands": self.hands, "credits": list(self.credits), "curve_hands": list(self.curve_hands),
+                    "curves": [list(self.curves[0]), list(self.curves[1])], "time": time.perf_counter()}
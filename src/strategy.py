@@ -2,6 +2,12 @@ import math
 import numpy as np
 import random
 
+# for the tools that work directly on the tables of a Strategy (snapshots, the parameter server, online learning),
+# raises a clear error if they are given a strategy without tables, like a LinearStrategy
+def require_tables(strategy, user):
+    if not hasattr(strategy, "action_values"):
+        raise TypeError("{} needs a tabular Strategy with action_values, not a {}".format(user, type(strategy).__name__))
+
 # this is the class that controls the logic regarding the players choice of action
 # as well as the n-step backup algorithm
 # it assumes the epsilon greedy policy
@@ -41,7 +47,7 @@ class Strategy():
         action = action_list[t]
 
         action_probas = self._get_action_probas_from_idx(state_list_idx, state_idx)
-        action_vals = self.action_values[state_list_idx][:, state_idx]
+        action_vals = self._get_values_from_idx(state_list_idx, state_idx)
         state_value = action_probas @ action_vals # each action probability times its value
         
         if n == 1: # if we are at t+n-1 we just return the reward + the state value
@@ -58,16 +64,20 @@ class Strategy():
                                                                                                                 n-1,
                                                                                                                 t+1
                                                                                                                 )
+    # helper function to get the values of both actions given the information of the state
+    def _get_values_from_idx(self, state_list_idx, state_idx):
+        return self.action_values[state_list_idx][:, state_idx]
+
     # helper function to get the action probabilty given the information of the state, and action
     def _get_action_proba_from_idx(self, state_list_idx, action, state_idx):
-        action_values = self.action_values[state_list_idx][:, state_idx]
+        action_values = self._get_values_from_idx(state_list_idx, state_idx)
         argmax = np.argmax(action_values)
         return (1 - self.epsilon + self.epsilon/2) if action == argmax else self.epsilon/2
     
     #helper function to get the action probabilties given the information of the state
     def _get_action_probas_from_idx(self, state_list_idx, state_idx):
         probas = np.full(2, self.epsilon/2)
-        argmax = np.argmax(self.action_values[state_list_idx][:, state_idx])
+        argmax = np.argmax(self._get_values_from_idx(state_list_idx, state_idx))
         probas[argmax] += 1-self.epsilon
         return probas
 
@@ -0,0 +1,171 @@
+import copy
+import csv
+import itertools
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.game import RLPlayer
+from src.tables import TableStrategy, TableGame, create_shared_tables, attach_shared_tables
+
+# the arguments that go to the Strategy constructor, everything else in a config is the epsilon schedule
+STRATEGY_ARGS = ["n", "gamma", "alpha", "decay_rate", "epsilon"]
+
+# the values used in the notebook
+DEFAULT_CONFIG = {"n": 2, "gamma": 1, "alpha": 0.5, "decay_rate": 0.1, "epsilon": 0.25,
+                  "epsilon_decay": 0.95, "decay_every": int(1e5)}
+
+# every combination of the values in the search space
+def grid_search(space):
+    keys = list(space.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*[space[key] for key in keys])]
+
+# n_samples random configurations, a list means pick one of the values and a tuple (low, high) means uniform
+def random_search(space, n_samples, seed = None):
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_samples):
+        config = {}
+        for key, values in space.items():
+            if isinstance(values, tuple):
+                config[key] = rng.uniform(values[0], values[1])
+            else:
+                config[key] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+def make_strategy(config):
+    config = {**DEFAULT_CONFIG, **config}
+    return TableStrategy(**{key: config[key] for key in STRATEGY_ARGS})
+
+# trains the strategy in self-play for n_games, continuing the epsilon schedule from games_played
+# if a snapshot pool is given, the opponent is a past version of the strategy sampled from the pool (fictitious self-play)
+def train(strategy, config, n_games, games_played = 0, game_class = TableGame, pool = None):
+    config = {**DEFAULT_CONFIG, **config}
+    players = [RLPlayer(strategy), RLPlayer(strategy)] # giving them the same strat
+    for i in range(games_played, games_played + n_games):
+        #every decay_every steps update epsilon to make it less random
+        if i % config["decay_every"] == 0:
+            strategy.epsilon = config["epsilon"] * config["epsilon_decay"]**(i // config["decay_every"] + 1)
+        if pool is not None:
+            if i % pool.snapshot_every == 0 or len(pool) == 0:
+                pool.add(strategy)
+            # the learner has to be the first player, since the game updates the first players strategy
+            players[1].strategy = pool.sample()
+        game = game_class(players)
+        game.simulate_game()
+    return strategy
+
+# plays the strategy greedily without learning against a fixed opponent, and returns the mean reward pr. game
+# every game is seeded with seed + its number, so every strategy is scored on the same deals
+# (seeding only once would not do that, since how long each game lasts depends on the strategy)
+def evaluate(strategy, n_games, opponent = None, seed = 0, game_class = TableGame):
+    frozen = copy.deepcopy(strategy)
+    frozen.epsilon = 0
+    frozen.make_value_update = lambda *args, **kwargs: None # the game always updates the first players strategy
+    if opponent is None: # an opponent that choses at random
+        opponent = TableStrategy(n = 1, gamma = 1, epsilon = 1)
+    players = [RLPlayer(frozen), RLPlayer(opponent)]
+    state = np.random.get_state()
+    total = 0
+    for g in range(n_games):
+        np.random.seed(seed + g)
+        game = game_class(players)
+        game.simulate_game()
+        total += sum(game.rewards[0])
+    np.random.set_state(state)
+    return total / n_games
+
+# the state of the worker processes, set once by _init_worker
+_worker = {}
+
+def _init_worker(spec, opponent, eval_games, eval_seed):
+    attach_shared_tables(spec)
+    _worker.update(opponent = opponent, eval_games = eval_games, eval_seed = eval_seed)
+
+# runs one trial for n_games more games and scores it
+def _run_trial(trial_id, config, strategy, games_played, n_games, seed):
+    np.random.seed(seed)
+    if strategy is None:
+        strategy = make_strategy(config)
+    train(strategy, config, n_games, games_played)
+    score = evaluate(strategy, _worker["eval_games"], _worker["opponent"], _worker["eval_seed"])
+    return trial_id, strategy, games_played + n_games, score
+
+# runs the configurations with successive halving:
+# every rung trains the surviving configurations for more games, and only the best 1/eta of them continue
+class SweepRunner():
+    def __init__(self, configs, min_games = 10000, eta = 3, n_rungs = 3, eval_games = 5000,
+                 eval_seed = 0, opponent = None, n_workers = None, results_path = "sweep_results.csv"):
+        """
+        ##parameters:
+        configs: list of dicts with Strategy arguments and the epsilon schedule (epsilon_decay, decay_every)
+        min_games: the number of training games in the first rung, each rung trains eta times as many
+        eta: the fraction 1/eta of the configurations that survive each rung
+        n_rungs: the maximum number of rungs
+        eval_games: the number of games for the frozen evaluation
+        opponent: the strategy to evaluate against, defaults to a random player
+        results_path: where the results table is written (csv)
+        """
+        self.configs = configs
+        self.min_games = min_games
+        self.eta = eta
+        self.n_rungs = n_rungs
+        self.eval_games = eval_games
+        self.eval_seed = eval_seed
+        self.opponent = opponent
+        self.n_workers = n_workers
+        self.results_path = results_path
+        self.results = [] # one row for each trial at each rung
+        self.strategies = {} # the latest strategy of each trial
+
+    def run(self):
+        shms, spec = create_shared_tables()
+        try:
+            with ProcessPoolExecutor(max_workers = self.n_workers, initializer = _init_worker,
+                                     initargs = (spec, self.opponent, self.eval_games, self.eval_seed)) as pool:
+                self._run_rungs(pool)
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+        return self.best()
+
+    def _run_rungs(self, pool):
+        alive = list(range(len(self.configs)))
+        games_played = {trial_id: 0 for trial_id in alive}
+        for rung in range(self.n_rungs):
+            target = self.min_games * self.eta**rung # the total amount of games at this rung
+            futures = [pool.submit(_run_trial, trial_id, self.configs[trial_id], self.strategies.get(trial_id),
+                                   games_played[trial_id], target - games_played[trial_id], rung*len(self.configs) + trial_id)
+                       for trial_id in alive]
+            scores = {}
+            for future in futures:
+                trial_id, strategy, games_played[trial_id], scores[trial_id] = future.result()
+                self.strategies[trial_id] = strategy
+
+            # keep the best 1/eta, the rest are pruned (unless this is the last rung, then nothing is pruned)
+            ranked = sorted(alive, key = lambda trial_id: scores[trial_id], reverse = True)
+            n_keep = max(1, len(ranked) // self.eta)
+            final = rung == self.n_rungs - 1 or n_keep == 1
+            for place, trial_id in enumerate(ranked):
+                self.results.append({"trial": trial_id, "rung": rung, "games": games_played[trial_id], "score": scores[trial_id],
+                                     "pruned": place >= n_keep and not final, **self.configs[trial_id]})
+            self.write_results()
+            alive = ranked[:n_keep]
+            if final:
+                break
+
+    def write_results(self):
+        fields = ["trial", "rung", "games", "score", "pruned"]
+        for row in self.results: # the configs do not have to have the same keys
+            fields.extend(key for key in row if key not in fields)
+        with open(self.results_path, "w", newline = "") as f:
+            writer = csv.DictWriter(f, fieldnames = fields)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+    # the config and strategy of the best trial in the last rung it was run
+    def best(self):
+        last_rung = max(row["rung"] for row in self.results)
+        best_row = max((row for row in self.results if row["rung"] == last_rung), key = lambda row: row["score"])
+        return self.configs[best_row["trial"]], self.strategies[best_row["trial"]]
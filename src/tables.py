@@ -0,0 +1,160 @@
+import math
+import numpy as np
+from multiprocessing import shared_memory
+from src.strategy import Strategy
+from src.game import Game
+
+# precomputed read-only tables, so that the simulation does not have to recompute
+# the state indices and the showdown winners with math.comb and np.unique every time.
+# the cards are encoded in base 11 (card values are 1-10), in the order they are given,
+# so the lookups do not even need the cards to be sorted.
+
+TABLE_NAMES = ["hand_idx", "board_idx_1", "board_idx_2", "board_idx_3",
+               "state_idx_0", "state_idx_1", "state_idx_2", "state_idx_3", "showdown"]
+
+_tables = {} # the tables the current process is using (name -> array)
+_shms = [] # keeping references to the shared memory so it is not garbage collected
+# the tables the lookups use, kept as module globals so a lookup does not have to go through the dict
+_state_idx = [] # the state index for each number of board cards, indexed by the code of hand + board
+_hand_idx = None
+_board_idx_3 = None
+_showdown = None
+
+# encodes a list of cards into a single number in base 11
+def encode_cards(cards):
+    code = 0
+    for card in cards:
+        code = code*11 + card
+    return code
+
+# builds the hand index table and the board index tables for 1-3 board cards
+def build_index_tables():
+    strategy = Strategy(n = 1, gamma = 1)
+    tables = {}
+    hand_idx = np.zeros(11**2, dtype = np.int32)
+    for a in range(1, 11):
+        for b in range(1, 11):
+            hand_idx[encode_cards([a, b])] = strategy._cards_to_index([a, b], n=10)
+    tables["hand_idx"] = hand_idx
+
+    for k in range(1, 4):
+        board_idx = np.zeros(11**k, dtype = np.int32)
+        for code in range(11**k):
+            cards = []
+            rest = code
+            for _ in range(k): # decoding back to the cards
+                cards.append(rest % 11)
+                rest //= 11
+            if 0 in cards: # 0 is not a card, so this entry is never used
+                continue
+            board_idx[code] = strategy._cards_to_index(cards, n=10)
+        tables["board_idx_{}".format(k)] = board_idx
+
+    # the full state index (like Strategy._get_state_idx) of the hand and board encoded together,
+    # so a lookup is a single index: hand_code * 11**k + board_code
+    tables["state_idx_0"] = hand_idx.copy()
+    for k in range(1, 4):
+        n_board_combos = math.comb(10 + k - 1, k)
+        tables["state_idx_{}".format(k)] = np.add.outer(hand_idx * n_board_combos, tables["board_idx_{}".format(k)]).ravel().astype(np.int32)
+    return tables
+
+# the score of a hand at showdown: (how many of a kind) * 11 + (the value of that kind)
+# a higher score always wins, this is the same rule as Game.get_winner
+def _showdown_score(cards):
+    counts = np.bincount(cards, minlength = 11)
+    max_count = counts.max()
+    max_value = np.where(counts == max_count)[0][-1] # the right most argmax (the highest value)
+    return max_count*11 + max_value
+
+# builds the showdown outcome table indexed by [hand0_idx, hand1_idx, board_idx] for 3 board cards,
+# the value is the winner in the same format as Game.get_winner (0, 1 or 2 for a tie)
+def build_showdown_table():
+    strategy = Strategy(n = 1, gamma = 1)
+    n_hands = math.comb(11, 2)
+    n_boards = math.comb(12, 3)
+    scores = np.zeros([n_hands, n_boards], dtype = np.int16)
+    for hand_idx in range(n_hands):
+        hand = strategy._index_to_cards(hand_idx, k=2)
+        for board_idx in range(n_boards):
+            board = strategy._index_to_cards(board_idx, k=3)
+            scores[hand_idx, board_idx] = _showdown_score(hand + board)
+
+    # comparing the scores of every pair of hands on every board at once
+    score0 = scores[:, None, :]
+    score1 = scores[None, :, :]
+    showdown = np.full([n_hands, n_hands, n_boards], 2, dtype = np.int8)
+    showdown[score0 > score1] = 0
+    showdown[score0 < score1] = 1
+    return showdown
+
+def build_tables():
+    tables = build_index_tables()
+    tables["showdown"] = build_showdown_table()
+    return tables
+
+# copies the tables into shared memory blocks and returns the handles and a description
+# that other processes can use with attach_shared_tables
+def create_shared_tables(tables = None):
+    if tables is None:
+        tables = build_tables()
+    shms = []
+    spec = {}
+    for name in TABLE_NAMES:
+        array = tables[name]
+        shm = shared_memory.SharedMemory(create = True, size = array.nbytes)
+        shared = np.ndarray(array.shape, dtype = array.dtype, buffer = shm.buf)
+        shared[:] = array
+        shms.append(shm)
+        spec[name] = (shm.name, array.shape, array.dtype.str)
+    return shms, spec
+
+# makes the current process use the shared tables described by spec (read only)
+def attach_shared_tables(spec):
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name = shm_name)
+        array = np.ndarray(shape, dtype = np.dtype(dtype), buffer = shm.buf)
+        array.flags.writeable = False
+        _shms.append(shm)
+        _tables[name] = array
+    _cache_tables()
+
+# makes the current process use tables it owns itself (eg. when not running in a pool)
+def use_tables(tables):
+    _tables.update(tables)
+    _cache_tables()
+
+def _cache_tables():
+    global _hand_idx, _board_idx_3, _showdown
+    _state_idx[:] = [_tables["state_idx_{}".format(k)] for k in range(4)]
+    _hand_idx = _tables["hand_idx"]
+    _board_idx_3 = _tables["board_idx_3"]
+    _showdown = _tables["showdown"]
+
+def get_tables():
+    if not _tables: # build them the first time if nobody has given us any
+        use_tables(build_tables())
+    return _tables
+
+# a strategy that looks up the state index instead of computing it
+class TableStrategy(Strategy):
+    def _get_state_idx(self, hand, board):
+        if not _state_idx:
+            get_tables()
+        code = 0
+        for card in hand + board: # encode_cards inlined, this is called for every player every round
+            code = code*11 + card
+        return int(_state_idx[len(board)][code])
+
+# a game that looks up the showdown winner instead of computing it
+class TableGame(Game):
+    def get_winner(self, hands):
+        if _showdown is None:
+            get_tables()
+        board = hands[0][2:]
+        hand0_idx = _hand_idx[encode_cards(hands[0][:2])]
+        hand1_idx = _hand_idx[encode_cards(hands[1][:2])]
+        board_idx = _board_idx_3[encode_cards(board)]
+        winner = int(_showdown[hand0_idx, hand1_idx, board_idx])
+        if winner == 2:
+            return 2, 2
+        return winner, 1 - winner